@@ -7,16 +7,157 @@ It leverages the Linux kernel’s standard hardware monitoring framework (hwmon
 to read connected sensor data as JSON, validates sensor count and value ranges,
 and returns structured exit codes.
 """
-import argparse
-import json
+import collections
+import functools
+import hashlib
+import math
+import os
+import select
 import sys
-import paramiko
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+
+# Remote command printing lm-sensors readings as JSON
+SENSORS_CMD = "sensors -j"
+
+# Directory of the SENSORS_MEMO=1 disk cache of sensors output
+MEMO_DIR = ".memo"
+
+# Pooled SSH connections, keyed by (host, user, port, key/password hash)
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+# Seconds between keepalive packets on pooled transports
+KEEPALIVE_INTERVAL = 30
+# Receive window of channels on pooled transports (paramiko default: 2 MiB)
+WINDOW_SIZE = 2**24
+# Bytes requested per recv() when reading command output
+RECV_CHUNK_SIZE = 2**20
+# Longest wait for channel output before stderr and the exit status are checked again
+RECV_POLL_TIMEOUT = 0.1
+# Marker line echoed between the outputs of batched commands
+BATCH_SEPARATOR = "__SEP__"
+# Raw lm-sensors units (millidegrees, millipercent) per human unit
+MILLI = 1000
+# Limits of the int32 arrays built by flatten_many
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+# Acceptable (min, max) values of one sensor type, in human units
+Range = collections.namedtuple("Range", "lo hi")
+
+
+def _pool_key(host, user, password=None, key=None, port=22):
+    """
+    Build the connection pool key for a set of SSH credentials.
+
+    The password is hashed so that it is never kept in plain text as part of the key.
+    """
+    secret = key or hashlib.sha256((password or "").encode()).hexdigest()
+    return host, user, port, secret
+
+
+def _get_client(host, user, password=None, key=None, port=22):
+    """
+    Return a connected SSHClient for the given credentials, reusing a pooled one if possible.
+
+    A new client is created when there is no pooled connection yet or when its
+    transport has been dropped (remote restart, network failure, idle timeout).
+
+    Parameters:
+        host, user, password, key, port: same as ssh_run.
+
+    Returns:
+        paramiko.SSHClient: Connected client, owned by the pool.
+    """
+    pool_key = _pool_key(host, user, password=password, key=key, port=port)
+    with _POOL_LOCK:
+        pooled = _POOL.get(pool_key)
+    if _is_active(pooled):
+        return pooled
+
+    # Imported on first connect: paramiko and its crypto backends are slow to load,
+    # and neither --help nor the data processing helpers need them
+    import paramiko
+
+    conn = paramiko.SSHClient()
+    conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    if key:
+        conn.connect(host, username=user, key_filename=key, port=port, timeout=10)
+    else:
+        conn.connect(host, username=user, password=password, port=port, timeout=10)
+    transport = conn.get_transport()
+    # Keep idle pooled sessions alive through NAT and firewalls
+    transport.set_keepalive(KEEPALIVE_INTERVAL)
+    # A large receive window lets big outputs arrive without waiting for window adjusts
+    transport.default_window_size = WINDOW_SIZE
+
+    with _POOL_LOCK:
+        current = _POOL.get(pool_key)
+        if current is not pooled and _is_active(current):
+            # Another thread connected meanwhile, keep its connection
+            winner, loser = current, conn
+        else:
+            _POOL[pool_key] = conn
+            winner, loser = conn, current
+    if loser is not None:
+        loser.close()
+    return winner
+
+
+def _is_active(conn):
+    """Return True if the SSHClient has a live transport."""
+    transport = conn.get_transport() if conn is not None else None
+    return transport is not None and transport.is_active()
+
+
+def close_pool():
+    """Close and forget all pooled SSH connections."""
+    with _POOL_LOCK:
+        conns = list(_POOL.values())
+        _POOL.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Warning: Failed to close SSH connection: {e}", file=sys.stderr)
+
+
+def _recv_all(channel):
+    """
+    Read a channel's stdout and stderr in large chunks until the command exits.
+
+    Both streams are drained in the same loop: a command that fills the stderr window
+    while stdout is still being read would otherwise block forever.
+
+    Returns:
+        tuple: (stdout, stderr) raw bytes.
+    """
+    out, err = [], []
+    while True:
+        if channel.recv_stderr_ready():
+            err.append(channel.recv_stderr(RECV_CHUNK_SIZE))
+        elif channel.recv_ready():
+            out.append(channel.recv(RECV_CHUNK_SIZE))
+        elif channel.exit_status_ready():
+            # Output arrives before the exit status, so both buffers are complete here
+            return b"".join(out), b"".join(err)
+        else:
+            # Wakes up on stdout or stderr data and on EOF, the timeout covers a late exit status
+            select.select([channel], [], [], RECV_POLL_TIMEOUT)
 
 
 def ssh_run(host, user, password=None, key=None, cmd="", port=22):
     """
     Execute a shell command on a remote host via SSH.
 
+    Connections are kept in a module-level pool keyed by (host, user, port, key/password hash),
+    so repeated calls to the same host pay the SSH handshake only once.
+    Each command runs in its own session channel multiplexed over the pooled transport,
+    the same idea as OpenSSH `ControlMaster`: key exchange and authentication happen
+    on the first call only. Use `close_pool` to release the connections.
+
     Parameters:
         host (str): IP address or hostname of the remote device.
         user (str): SSH username.
@@ -26,37 +167,129 @@ def ssh_run(host, user, password=None, key=None, cmd="", port=22):
         port (int): Port of SSH.
 
     Returns:
-        str: Decoded stdout output of the command.
+        bytes: Raw stdout output of the command.
 
     Raises:
         Exception: If SSH connection or command execution fails.
     """
-    conn = None
+    channel = None
     try:
-        conn = paramiko.SSHClient()
-        conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        if key:
-            conn.connect(host, username=user, key_filename=key, port=port, timeout=10)
-        else:
-            conn.connect(host, username=user, password=password, port=port, timeout=10)
+        conn = _get_client(host, user, password=password, key=key, port=port)
 
-        stdin, stdout, stderr = conn.exec_command(cmd)
-        err = stderr.read().decode()
-        if err:
-            print(f"SSH command error: {err}", file=sys.stderr)
+        # Open a new session on the already authenticated transport instead of a new connection
+        channel = conn.get_transport().open_session()
+        channel.exec_command(cmd)
+        out, err = _recv_all(channel)
+        # stderr is only decoded and reported when the command failed
+        exit_status = channel.recv_exit_status()
+        if exit_status != 0:
+            print(f"SSH command error (exit status {exit_status}): {err.decode()}", file=sys.stderr)
 
-        return stdout.read().decode()
+        return out
 
     except Exception as e:
         print(f"SSH operation failed: {e}", file=sys.stderr)
         raise  # Re-raise the exception after cleanup
     finally:
-        if conn is not None:
-            try:
-                conn.close()
-            except Exception as e:
-                print(f"Warning: Failed to close SSH connection: {e}", file=sys.stderr)
+        # Only the channel is closed, the connection stays in the pool
+        if channel is not None:
+            channel.close()
+
+
+def run_batch(host, user, cmds, password=None, key=None, port=22):
+    """
+    Execute several shell commands on a remote host in a single SSH round trip.
+
+    Each command runs in its own `{ ...; }` group on separate lines of one remote shell
+    script, followed by an echoed separator line, and the combined stdout is split back
+    per command. Trailing `;`, `&` or `#` comments in a command do not affect the others.
+
+    Parameters:
+        host, user, password, key, port: same as ssh_run.
+        cmds (list): Commands to execute, in order.
+
+    Returns:
+        list: Decoded stdout output of each command.
+
+    Raises:
+        RuntimeError: If the output does not split into one part per command
+            (e.g. a shell syntax error aborted the script).
+
+    Example:
+        >>> run_batch("10.0.0.5", "root", ["uptime", "cat /sys/class/hwmon/hwmon*/name"], key="id_rsa")
+        [' 10:12:01 up 3 days, ...\n', 'coretemp\nacpitz\n']
+    """
+    if not cmds:
+        return []
+    script = "".join(f"{{ {cmd}\n}}\necho {BATCH_SEPARATOR}\n" for cmd in cmds)
+    raw = ssh_run(host, user, password=password, key=key, cmd=script, port=port)
+    parts = raw.decode().split(f"{BATCH_SEPARATOR}\n")
+    # A complete run ends with the last separator, leaving an empty tail
+    if len(parts) != len(cmds) + 1 or parts[-1]:
+        raise RuntimeError(f"Batch output has {len(parts) - 1} separators, expected {len(cmds)}")
+    return parts[:-1]
+
+
+def _memo_to_disk(func):
+    """
+    Cache the raw output of a (host, user, ..., port) fetch function on disk for dev/test runs.
+
+    Enabled only when the SENSORS_MEMO=1 environment variable is set. Results are stored in
+    MEMO_DIR as `sensors-<key>.json`, keyed by host, port and the current minute, so repeated
+    runs within the same minute reuse the output instead of connecting again.
+    Only complete JSON output is cached: a failed command (empty stdout) or truncated
+    output is fetched again on the next call.
+    """
+    @functools.wraps(func)
+    def wrapper(host, user, password=None, key=None, port=22):
+        if os.environ.get("SENSORS_MEMO") != "1":
+            return func(host, user, password=password, key=key, port=port)
+
+        minute_bucket = int(time.time() // 60)
+        memo_key = hashlib.sha256(f"{host}:{port}:{minute_bucket}".encode()).hexdigest()[:12]
+        path = os.path.join(MEMO_DIR, f"sensors-{memo_key}.json")
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        raw = func(host, user, password=password, key=key, port=port)
+        try:
+            orjson.loads(raw)
+        except ValueError:
+            return raw
+        _write_atomic(path, raw)
+        return raw
+    return wrapper
+
+
+def _write_atomic(path, data):
+    """Write data to path through a temporary file, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@_memo_to_disk
+def get_sensors_raw(host, user, password=None, key=None, port=22):
+    """
+    Retrieve raw lm-sensors output from the remote host.
+
+    Parameters:
+        host, user, password, key, port: same as ssh_run.
+
+    Returns:
+        bytes: Unparsed stdout of `sensors -j`, from the disk memo when SENSORS_MEMO=1.
+    """
+    return ssh_run(host, user, password=password, key=key, cmd=SENSORS_CMD, port=port)
 
 
 def get_sensors_json(host, user, password=None, key=None, port=22):
@@ -80,14 +313,26 @@ def get_sensors_json(host, user, password=None, key=None, port=22):
       }
     }
     """
+    return parse_sensors_json(get_sensors_raw(host, user, password=password, key=key, port=port))
+
+
+def parse_sensors_json(raw):
+    """
+    Load raw lm-sensors output as JSON, exiting with code 3 if it cannot be parsed.
+
+    Parameters:
+        raw (bytes): Output of `sensors -j`.
+
+    Returns:
+        dict: Parsed JSON data from lm-sensors.
+    """
     try:
-        raw = ssh_run(host, user, password=password, key=key, cmd="sensors -j", port=port)
-        data = json.loads(raw)
+        data = orjson.loads(raw)
         return data
     except TypeError as e:
         print(f"Error - non-deserializable data received: {e}")
         sys.exit(3)
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"Error parsing sensors JSON: {e}")
         sys.exit(3)
     except ValueError as e:
@@ -95,6 +340,105 @@ def get_sensors_json(host, user, password=None, key=None, port=22):
         sys.exit(3)
 
 
+def get_sensors_json_many(hosts, user, password=None, key=None, port=22, max_workers=None):
+    """
+    Retrieve and parse lm-sensors output from several hosts concurrently.
+
+    The work is I/O-bound, so each host is polled in its own worker thread and the
+    total time is roughly that of the slowest host instead of the sum of all of them.
+    Failures do not abort the other hosts: the exception is returned in place of the data.
+
+    This is a library helper for fleet checks; the CLI checks a single host.
+
+    Parameters:
+        hosts (list): IP addresses or hostnames of the remote devices.
+        user, password, key, port: same as ssh_run, shared by all hosts.
+        max_workers (int, optional): Thread count limit (default: one per host, at most 32).
+
+    Returns:
+        dict: {host: dict | Exception} parsed JSON data or the error raised for that host.
+    """
+    def _fetch(host):
+        return orjson.loads(get_sensors_raw(host, user, password=password, key=key, port=port))
+
+    hosts = list(dict.fromkeys(hosts))
+    if not hosts:
+        return {}
+    workers = max_workers or min(32, len(hosts))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {host: executor.submit(_fetch, host) for host in hosts}
+
+    results = {}
+    for host, future in futures.items():
+        try:
+            results[host] = future.result()
+        except Exception as e:
+            results[host] = e
+    return results
+
+
+class SensorStream:
+    """
+    Periodic `sensors -j` samples read from one long-running remote command.
+
+    The remote side loops `sensors -j` and prints each document on a single line,
+    so every sample arrives over the same session channel: no new channel and no
+    extra round trip per sample. Iteration ends when the remote command exits.
+
+    Example:
+        >>> for data in SensorStream("10.0.0.5", "root", key="id_rsa", interval=5):
+        ...     print(flatten_sensors(data))
+        {'temp': [24.0, 23.0], 'hum': [50.0]}
+        {'temp': [24.1, 23.0], 'hum': [49.8]}
+    """
+
+    def __init__(self, host, user, password=None, key=None, port=22, interval=5):
+        """
+        Parameters:
+            host, user, password, key, port: same as ssh_run.
+            interval (float): Seconds to sleep between samples on the remote host.
+        """
+        self.host = host
+        self.user = user
+        self.password = password
+        self.key = key
+        self.port = port
+        self.interval = interval
+
+    @property
+    def command(self):
+        """Remote shell loop printing one JSON document per line."""
+        return f"while true; do {SENSORS_CMD} | tr -d '\\n'; echo; sleep {self.interval:g}; done"
+
+    def __iter__(self):
+        """
+        Yield parsed JSON data (dict) for each sample.
+
+        Raises:
+            ValueError: If a sample line is empty (`sensors -j` failed or printed nothing),
+                with the remote stderr of that sample in the message.
+            orjson.JSONDecodeError: If a sample line is not valid JSON.
+        """
+        conn = _get_client(self.host, self.user, password=self.password, key=self.key, port=self.port)
+        channel = conn.get_transport().open_session()
+        try:
+            channel.exec_command(self.command)
+            for line in channel.makefile("rb"):
+                # Drain stderr on every sample so it never fills the channel window,
+                # only this sample's part is kept to explain an empty line
+                err = []
+                while channel.recv_stderr_ready():
+                    err.append(channel.recv_stderr(RECV_CHUNK_SIZE))
+                if not line.strip():
+                    reason = b"".join(err).decode(errors="replace").strip()
+                    message = f"empty sample, `{SENSORS_CMD}` printed nothing"
+                    raise ValueError(f"{message}: {reason}" if reason else message)
+                yield orjson.loads(line)
+        finally:
+            # Closing the channel stops the remote loop, the connection stays in the pool
+            channel.close()
+
+
 def flatten_sensors(data):
     """
     Flatten raw sensors JSON into separate temperature and humidity lists.
@@ -116,35 +460,144 @@ def flatten_sensors(data):
         })
         {'temp': [24.0, 23.0], 'hum': [50.0]}
     """
+    temp_raw, hum_raw = _collect_raw(data)
+    return {"temp": [_to_unit(val) for val in temp_raw], "hum": [_to_unit(val) for val in hum_raw]}
+
+
+def flatten_many(datas):
+    """
+    Flatten raw sensors JSON of many hosts into two contiguous arrays.
+
+    Parameters:
+        datas (list): JSON outputs from lm-sensors, one per host.
+
+    Values stay in raw millidegrees/millipercent as int32: half the memory of float64
+    and no per-value division or rounding. Pass them to `validate` with `scale=MILLI`.
+
+    Returns:
+        tuple: (temps, hums) numpy int32 arrays of all hosts' raw values,
+            concatenated in host order.
+
+    Raises:
+        ValueError: If a raw value does not fit in int32.
+    """
+    temp_raw, hum_raw = [], []
+    for data in datas:
+        temps, hums = _collect_raw(data)
+        temp_raw += temps
+        hum_raw += hums
+    return _to_milli(temp_raw), _to_milli(hum_raw)
+
+
+def _collect_raw(data):
+    """
+    Walk raw sensors JSON once and collect the numeric input values.
+
+    Returns:
+        tuple: (temp_raw, hum_raw) lists of raw millidegree/millipercent values.
+    """
     flat = {"temp": [], "hum": []}
+    for kind, val in _iter_inputs(data):
+        flat[kind].append(val)
+    return flat["temp"], flat["hum"]
+
+
+def _iter_inputs(data):
+    """
+    Yield (kind, raw value) for every numeric sensor input in raw sensors JSON, in JSON order.
+
+    The single walk behind every flattener, so they all skip and warn about the same fields.
+    """
     for chip in data.values():
-        for label, val in chip.items():
+        for label, kind in _classify_labels(tuple(chip)):
+            val = chip[label]
             # Skip non-numeric values
             if not isinstance(val, (int, float)):
                 print(f"Warning: sensor value {label} is not numeric, skipping")
                 continue
+            yield kind, val
 
-            # Only process actual sensor input fields
-            if not label.endswith("_input"):
-                continue
 
-            # Convert and round
-            value = round(val / 1000, 1)
-            if label.startswith("temp"):
-                flat["temp"].append(value)
-            elif label.startswith("humidity"):
-                flat["hum"].append(value)
-    return flat
+@functools.lru_cache(maxsize=256)
+def _classify_labels(labels):
+    """
+    Pick the sensor input fields out of a chip's labels.
+
+    Chips report the same labels on every read, so the string checks are done
+    once per chip layout and cached.
+
+    Parameters:
+        labels (tuple): Labels of one chip, in JSON order.
+
+    Returns:
+        tuple: ((label, 'temp' | 'hum'), ...) for temperature and humidity inputs.
+    """
+    pairs = []
+    for label in labels:
+        # Only process actual sensor input fields
+        if not label.endswith("_input"):
+            continue
+        if label.startswith("temp"):
+            pairs.append((label, "temp"))
+        elif label.startswith("humidity"):
+            pairs.append((label, "hum"))
+    return tuple(pairs)
+
+
+def _to_unit(val):
+    """Convert a raw sensor value to human units, rounded to one decimal."""
+    return round(val / MILLI, 1)
+
+
+def _to_milli(raw):
+    """
+    Convert raw sensor values to an int32 array, rounding fractional millivalues.
+
+    Raises:
+        ValueError: If a value does not fit in int32, instead of letting the cast wrap it.
+    """
+    import numpy as np
+
+    arr = np.rint(np.asarray(raw, dtype=np.float64))
+    bad = ~((arr >= INT32_MIN) & (arr <= INT32_MAX))
+    if bad.any():
+        raise ValueError(f"sensor value {arr[bad][0]} does not fit in int32")
+    return arr.astype(np.int32)
 
 
-def validate(values, ranges):
+def _is_array(readings):
+    """Return True for numpy arrays, without importing numpy for plain lists."""
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(readings, np.ndarray)
+
+
+def _scale_bounds(lo, hi, scale):
+    """
+    Scale a (min, max) range once to inclusive integer bounds for raw int32 readings.
+
+    Both bounds are clamped to just outside the int32 range, so infinite bounds convert
+    and a bound above or below every reading still excludes them all.
+    """
+    if math.isnan(lo) or math.isnan(hi):
+        # Nothing compares in range against NaN, keep that for the integer bounds
+        return INT32_MAX + 1, INT32_MIN - 1
+    lo_s = min(max(lo * scale, INT32_MIN), INT32_MAX + 1)
+    hi_s = min(max(hi * scale, INT32_MIN - 1), INT32_MAX)
+    # Rounding first absorbs float noise such as 0.1 * 1000 == 100.00000000000001
+    return math.ceil(round(lo_s, 6)), math.floor(round(hi_s, 6))
+
+
+def validate(values, ranges, scale=1):
     """
     Check sensor values against their acceptable ranges.
     Check if there are all values for ranges.
 
     Parameters:
-        values (dict): {'temp': [...], 'hum': [...]} lists of sensor readings.
-        ranges (dict): {'temp': (min, max), 'hum': (min, max)} thresholds.
+        values (dict): {'temp': [...], 'hum': [...]} lists or numpy arrays of sensor readings.
+        ranges (dict): {'temp': Range(min, max), 'hum': Range(min, max)} thresholds,
+            plain (min, max) tuples work as well.
+        scale (int): Raw units per human unit of the readings, e.g. MILLI for the int32
+            arrays of flatten_many. Ranges are scaled once, readings only for the messages.
 
     Returns:
         list: Descriptions of out-of-range values, empty if all OK.
@@ -184,22 +637,183 @@ def validate(values, ranges):
         if sensor_type not in ranges:
             # For sensors without a range, add a special mark
             for i, val in enumerate(readings, start=1):
-                issues.append(f"{sensor_type}{i}: {val} (no range defined)")
+                issues.append(f"{sensor_type}{i}: {_unscale(val, scale)} (no range defined)")
             continue
 
         lo, hi = ranges[sensor_type]
-        for i, val in enumerate(readings, start=1):
-            if not lo <= val <= hi:
-                issues.append(f"{sensor_type}{i}: {val} out of {lo}..{hi}")
+        lo_s, hi_s = (lo, hi) if scale == 1 else _scale_bounds(lo, hi, scale)
+        if _is_array(readings):
+            import numpy as np
+
+            arr = readings.astype(np.float64, copy=False) if scale == 1 else readings
+            # Vectorized _out_of_range: compare the whole array at once, only outliers are formatted
+            bad_idx = np.flatnonzero(~((arr >= lo_s) & (arr <= hi_s))).tolist()
+        else:
+            bad_idx = [i for i, val in enumerate(readings) if _out_of_range(val, lo_s, hi_s)]
+        for i in bad_idx:
+            issues.append(_range_issue(sensor_type, i + 1, _unscale(readings[i], scale), lo, hi))
     return issues
 
 
+def _out_of_range(val, lo, hi):
+    """Range rule shared by all checks: bounds are inclusive and NaN is out of range."""
+    return not lo <= val <= hi
+
+
+def _range_issue(sensor_type, index, val, lo, hi):
+    """Describe one out-of-range reading, e.g. 'temp2: 55.0 out of 0..50'."""
+    return f"{sensor_type}{index}: {val} out of {lo}..{hi}"
+
+
+def flatten_and_validate(data, ranges):
+    """
+    Flatten raw sensors JSON and check the values against their ranges in a single pass.
+
+    Same results as flatten_sensors followed by validate, but every value is range-checked
+    as it is read, so the flattened lists are never walked a second time.
+
+    Parameters:
+        data (dict): JSON output from lm-sensors.
+        ranges (dict): {'temp': Range(min, max), 'hum': Range(min, max)} thresholds,
+            both sensor types must be present.
+
+    Returns:
+        tuple: (values, issues) as returned by flatten_sensors and validate.
+    """
+    flat = {"temp": [], "hum": []}
+    issues = {"temp": [], "hum": []}
+    bounds = {kind: ranges[kind] for kind in flat}
+    for kind, val in _iter_inputs(data):
+        value = _to_unit(val)
+        readings = flat[kind]
+        readings.append(value)
+        lo, hi = bounds[kind]
+        if _out_of_range(value, lo, hi):
+            issues[kind].append(_range_issue(kind, len(readings), value, lo, hi))
+    # Same order as validate: all temperature issues first
+    return flat, issues["temp"] + issues["hum"]
+
+
+def _unscale(val, scale):
+    """Convert a reading back to human units for display."""
+    return val if scale == 1 else float(val) / scale
+
+
+def write_json(vals):
+    """
+    Write sensor values to stdout as one line of JSON.
+
+    The orjson bytes go straight to the binary stdout buffer, skipping the str
+    allocation and text encoding of print.
+    """
+    # Keep anything already printed (e.g. warnings) ahead of the JSON line
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(vals, option=orjson.OPT_APPEND_NEWLINE))
+    sys.stdout.buffer.flush()
+
+
+def check_sensors(vals, issues, expected_sensors):
+    """
+    Print the health report for one sample of flattened sensor values.
+
+    Parameters:
+        vals (dict): {'temp': [...], 'hum': [...]} as returned by flatten_sensors.
+        issues (list): Out-of-range descriptions for vals, as returned by validate.
+        expected_sensors (int): Expected total number of sensors (temp+hum).
+
+    Returns:
+        int: 0 if all good, 1 if sensors are missing, 2 if values are out of range.
+    """
+    total = len(vals["temp"]) + len(vals["hum"])
+    print(
+        f"Found {len(vals['temp'])} temp sensors and "
+        f"{len(vals['hum'])} humidity sensors (total {total})"
+    )
+
+    print(f"Temperature values: {vals['temp']}")
+    print(f"Humidity values:    {vals['hum']}")
+
+    if total < expected_sensors:
+        print(f"Missing sensors: expected {expected_sensors}, found {total}")
+        return 1
+
+    if issues:
+        print("ISSUES:")
+        for issue in issues:
+            print(f"- {issue}")
+        return 2
+    return 0
+
+
+def poll(args, ranges):
+    """
+    Check every sample of a SensorStream until Ctrl+C.
+
+    The remote loop never ends on its own, so the stream ending (remote exit,
+    dropped connection) is reported as an error, and so is an empty or invalid sample.
+
+    Parameters:
+        args (argparse.Namespace): Parsed CLI arguments.
+        ranges (dict): {'temp': Range(min, max), 'hum': Range(min, max)} thresholds.
+
+    Returns:
+        int: The highest exit code seen across all samples, at least 1 if the stream
+            ended or no sample was checked, 3 on an empty or invalid sample.
+    """
+    worst = 0
+    samples = 0
+    stream = SensorStream(
+        args.host, args.user, password=args.password, key=args.key, port=args.port,
+        interval=args.poll_interval,
+    )
+    try:
+        for data in stream:
+            samples += 1
+            if args.raw_json_output:
+                write_json(flatten_sensors(data))
+                continue
+
+            vals, issues = flatten_and_validate(data, ranges)
+            code = check_sensors(vals, issues, args.expected_sensors)
+            if not code:
+                print("All sensors within range")
+            worst = max(worst, code)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        if not samples:
+            print("Interrupted before any sensor sample was checked", file=sys.stderr)
+            return 1
+        return worst
+    except orjson.JSONDecodeError as e:
+        print(f"Error parsing sensors JSON: {e}")
+        return 3
+    except ValueError as e:
+        # Empty sample, the message carries the remote stderr
+        print(f"Error reading sensors sample: {e}")
+        return 3
+
+    print(f"Sensor stream ended after {samples} samples", file=sys.stderr)
+    return max(worst, 1)
+
+
+def _positive_float(value):
+    """argparse type for strictly positive numbers of seconds."""
+    import argparse
+
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
 def main():
     """
     Parse CLI arguments, fetch remote sensor data, and run health checks.
 
     Supports JSON output, exit codes for missing sensors or out-of-range readings.
     """
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Health-check for temperature/humidity sensors over SSH"
     )
@@ -234,47 +848,39 @@ def main():
         type=float,
         default=[0, 100],
         metavar=("MIN_HUM", "MAX_HUM"),
-        help="Min/max humidity in %",
+        help="Min/max humidity in %%",
     )
     parser.add_argument(
         "--raw-json-output",
         action="store_true",
         help="Output raw sensor values as JSON and exit",
     )
+    parser.add_argument(
+        "--poll-interval",
+        type=_positive_float,
+        metavar="SECONDS",
+        help="Keep polling every SECONDS over one SSH channel until interrupted",
+    )
     args = parser.parse_args()
 
-    ranges = {"temp": tuple(args.temp_range), "hum": tuple(args.hum_range)}
+    ranges = {"temp": Range(*args.temp_range), "hum": Range(*args.hum_range)}
 
     try:
+        if args.poll_interval is not None:
+            sys.exit(poll(args, ranges))
+
         data = get_sensors_json(
             args.host, args.user, password=args.password, key=args.key, port=args.port
         )
 
-        vals = flatten_sensors(data)
-
         if args.raw_json_output:
-            print(json.dumps(vals))
+            write_json(flatten_sensors(data))
             sys.exit(0)
 
-        total = len(vals["temp"]) + len(vals["hum"])
-        print(
-            f"Found {len(vals['temp'])} temp sensors and "
-            f"{len(vals['hum'])} humidity sensors (total {total})"
-        )
-
-        print(f"Temperature values: {vals['temp']}")
-        print(f"Humidity values:    {vals['hum']}")
-
-        if total < args.expected_sensors:
-            print(f"Missing sensors: expected {args.expected_sensors}, found {total}")
-            sys.exit(1)
-
-        issues = validate(vals, ranges)
-        if issues:
-            print("ISSUES:")
-            for issue in issues:
-                print(f"- {issue}")
-            sys.exit(2)
+        vals, issues = flatten_and_validate(data, ranges)
+        code = check_sensors(vals, issues, args.expected_sensors)
+        if code:
+            sys.exit(code)
 
     except Exception as e:
         print(f"Failed to get sensor data: {e}", file=sys.stderr)
@@ -1,12 +1,19 @@
+import io
+import os
 import sys
 import json
+import subprocess
 
+import numpy as np
 import paramiko
 import pytest
 
 import sensors_checking
 from .test_data import SAMPLE_JSON
 
+# conftest replaces ssh_run for every test, keep the real one for its own tests
+real_ssh_run = sensors_checking.ssh_run
+
 """
 Unit tests for sensors_checking.py:
 
@@ -22,6 +29,12 @@ def test_flatten_sensors():
     assert vals == {"temp": [25.0, 26.0], "hum": [45.0]}
 
 
+def test_flatten_sensors_rounding():
+    """Values are rounded like Python round, e.g. 24050 millidegrees is 24.1."""
+    data = {"chip1": {"temp1_input": 24050, "temp2_input": 150, "temp3_input": 350}}
+    assert sensors_checking.flatten_sensors(data)["temp"] == [24.1, 0.1, 0.3]
+
+
 def test_validate_all_ok():
     """Check that validate returns empty list for all in-range values."""
     vals = {"temp": [25.0, 26.0], "hum": [45.0]}
@@ -82,7 +95,7 @@ def test_main_out_of_range(monkeypatch):
                 "humidity1_input": 150000  # 150%
             }
         }
-        return json.dumps(bad)
+        return json.dumps(bad).encode()
 
     monkeypatch.setattr(sensors_checking, "ssh_run", bad_ssh)
 
@@ -115,7 +128,18 @@ def test_main_ssh_failure(monkeypatch):
 
 def test_main_invalid_json(monkeypatch):
     """Test exit code 3 when sensors returns invalid JSON."""
-    monkeypatch.setattr(sensors_checking, "ssh_run", lambda *a, **k: "{invalid}")
+    monkeypatch.setattr(sensors_checking, "ssh_run", lambda *a, **k: b"{invalid}")
+    exit_exc = run_main_and_capture(monkeypatch, ["host", "user", "--password", "pass"])
+    assert exit_exc.code == 3
+
+
+@pytest.mark.parametrize("raw", [
+    json.dumps(SAMPLE_JSON).encode() + b" trailing-garbage",
+    b'{"c":{"temp1_input":25000,"temp2_input":26000,"humidity1_input":45000,"temp3_in',
+])
+def test_main_malformed_json(monkeypatch, raw):
+    """Output with valid sensor fields but broken JSON still exits 3."""
+    monkeypatch.setattr(sensors_checking, "ssh_run", lambda *a, **k: raw)
     exit_exc = run_main_and_capture(monkeypatch, ["host", "user", "--password", "pass"])
     assert exit_exc.code == 3
 
@@ -136,3 +160,413 @@ def test_main_raw_json_output(capsys, monkeypatch):
     captured = capsys.readouterr()
     assert json.loads(captured.out) == {"temp": [25.0, 26.0], "hum": [45.0]}
     assert exit_exc.code == 0
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+        self.default_window_size = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeSSHClient:
+    """Stand-in for paramiko.SSHClient that only records connects."""
+    connects = 0
+
+    def __init__(self):
+        self.transport = None
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, host, **kwargs):
+        FakeSSHClient.connects += 1
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport = None
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    FakeSSHClient.connects = 0
+    monkeypatch.setattr(paramiko, "SSHClient", FakeSSHClient)
+    yield FakeSSHClient
+    sensors_checking.close_pool()
+
+
+def test_pool_reuses_connection(fake_client):
+    """Repeated calls with the same credentials share a single connection."""
+    first = sensors_checking._get_client("host", "user", password="pass")
+    second = sensors_checking._get_client("host", "user", password="pass")
+    assert first is second
+    assert fake_client.connects == 1
+    assert first.get_transport().keepalive == sensors_checking.KEEPALIVE_INTERVAL
+    assert first.get_transport().default_window_size == sensors_checking.WINDOW_SIZE
+
+    sensors_checking._get_client("host", "user", password="other")
+    assert fake_client.connects == 2
+
+
+def test_pool_reconnects_dropped_transport(fake_client):
+    """A pooled connection whose transport went down is replaced."""
+    first = sensors_checking._get_client("host", "user", password="pass")
+    first.get_transport().active = False
+    second = sensors_checking._get_client("host", "user", password="pass")
+    assert second is not first
+    assert fake_client.connects == 2
+
+
+def test_get_sensors_json_many(monkeypatch):
+    """Each host gets its own result, a failing host does not hide the others."""
+    def per_host_ssh(host, user, password=None, key=None, cmd="", port=22):
+        if host == "down":
+            raise paramiko.SSHException("Connection failed")
+        return json.dumps(SAMPLE_JSON).encode()
+    monkeypatch.setattr(sensors_checking, "ssh_run", per_host_ssh)
+
+    results = sensors_checking.get_sensors_json_many(["up1", "down", "up2"], "user", password="pass")
+    assert results["up1"] == SAMPLE_JSON
+    assert results["up2"] == SAMPLE_JSON
+    assert isinstance(results["down"], paramiko.SSHException)
+
+
+def test_run_batch(monkeypatch):
+    """Outputs of batched commands are split back in order."""
+    def local_ssh(host, user, password=None, key=None, cmd="", port=22):
+        return subprocess.run(cmd, shell=True, capture_output=True).stdout
+    monkeypatch.setattr(sensors_checking, "ssh_run", local_ssh)
+
+    outputs = sensors_checking.run_batch("host", "user", ["echo one", "printf two", "true"], password="pass")
+    assert outputs == ["one\n", "two", ""]
+
+    outputs = sensors_checking.run_batch(
+        "host", "user", ["echo a;", "echo b # note", "sleep 0 &", "echo c"], password="pass"
+    )
+    assert outputs == ["a\n", "b\n", "", "c\n"]
+
+    with pytest.raises(RuntimeError):
+        sensors_checking.run_batch("host", "user", ["echo a", "echo 'unclosed"], password="pass")
+
+
+def test_flatten_many():
+    """Values of all hosts are concatenated into one array per kind."""
+    other = {"chip1": {"temp1_input": -5500, "humidity1_input": 60040}}
+    temps, hums = sensors_checking.flatten_many([SAMPLE_JSON, other])
+    assert temps.dtype == np.int32
+    assert temps.tolist() == [25000, 26000, -5500]
+    assert hums.tolist() == [45000, 60040]
+
+
+def test_validate_numpy_arrays():
+    """validate accepts the arrays produced by flatten_many."""
+    temps, hums = sensors_checking.flatten_many([SAMPLE_JSON, {"chip1": {"temp1_input": 90000}}])
+    issues = sensors_checking.validate(
+        {"temp": temps, "hum": hums}, {"temp": (-20, 80), "hum": (0, 100)}, scale=sensors_checking.MILLI
+    )
+    assert issues == ["temp3: 90.0 out of -20..80"]
+
+
+def test_validate_scaled_bounds():
+    """Scaled ranges are inclusive and free of float noise."""
+    temps = np.array([100, 99, 20000, 20001], dtype=np.int32)
+    issues = sensors_checking.validate({"temp": temps}, {"temp": (0.1, 20)}, scale=sensors_checking.MILLI)
+    assert issues == ["temp2: 0.099 out of 0.1..20", "temp4: 20.001 out of 0.1..20"]
+
+
+@pytest.mark.parametrize("bounds", [(float("inf"), 1), (0, float("-inf")), (float("nan"), 100)])
+def test_validate_scaled_bounds_outside_int32(bounds):
+    """Bounds beyond int32 or NaN exclude every reading, as they do unscaled."""
+    temps = np.array([sensors_checking.INT32_MIN, 0, 500, sensors_checking.INT32_MAX], dtype=np.int32)
+    issues = sensors_checking.validate({"temp": temps}, {"temp": bounds}, scale=sensors_checking.MILLI)
+    assert len(issues) == 4
+    assert issues == sensors_checking.validate({"temp": temps / sensors_checking.MILLI}, {"temp": bounds})
+
+
+def test_validate_scaled_infinite_range():
+    """An unbounded range accepts the whole int32 range."""
+    temps = np.array([sensors_checking.INT32_MIN, sensors_checking.INT32_MAX], dtype=np.int32)
+    inf = float("inf")
+    assert sensors_checking.validate({"temp": temps}, {"temp": (-inf, inf)}, scale=sensors_checking.MILLI) == []
+
+
+def test_flatten_many_rejects_values_outside_int32():
+    """Values that do not fit in int32 raise instead of wrapping around."""
+    with pytest.raises(ValueError):
+        sensors_checking.flatten_many([{"chip1": {"temp1_input": 3e9}}])
+
+
+def fake_exec_client(monkeypatch, channel):
+    class Client:
+        def get_transport(self):
+            return self
+
+        def open_session(self):
+            return channel
+
+    monkeypatch.setattr(sensors_checking, "_get_client", lambda *a, **k: Client())
+
+
+class FakeChannel:
+    """Session channel whose stdout replays predefined lines, each with optional stderr."""
+    def __init__(self, lines, errs=None):
+        self.lines = lines
+        self.errs = errs or [b""] * len(lines)
+        self.err = io.BytesIO()
+        self.command = None
+        self.closed = False
+
+    def exec_command(self, cmd):
+        self.command = cmd
+
+    def makefile(self, mode):
+        for line, err in zip(self.lines, self.errs):
+            # stderr of a sample arrives before its stdout line
+            self.err = io.BytesIO(self.err.read() + err)
+            yield line
+
+    def recv_stderr_ready(self):
+        return self.err.tell() < len(self.err.getbuffer())
+
+    def recv_stderr(self, nbytes):
+        return self.err.read(nbytes)
+
+    def close(self):
+        self.closed = True
+
+
+def test_sensor_stream(monkeypatch):
+    """SensorStream yields one parsed document per line and closes its channel."""
+    channel = FakeChannel([json.dumps(SAMPLE_JSON).encode() + b"\n", b'{"chip1": {}}\n'])
+    fake_exec_client(monkeypatch, channel)
+
+    samples = list(sensors_checking.SensorStream("host", "user", password="pass", interval=2))
+    assert samples == [SAMPLE_JSON, {"chip1": {}}]
+    assert "sleep 2;" in channel.command
+    assert channel.closed
+
+
+def test_sensor_stream_empty_sample(monkeypatch):
+    """A blank line (sensors printed nothing) is an error reporting that sample's stderr."""
+    channel = FakeChannel(
+        [json.dumps(SAMPLE_JSON).encode() + b"\n", b"\n"],
+        [b"ERROR: Can't get value of subfeature temp2_input\n", b"No sensors found!\n"],
+    )
+    fake_exec_client(monkeypatch, channel)
+
+    stream = iter(sensors_checking.SensorStream("host", "user", password="pass"))
+    assert next(stream) == SAMPLE_JSON
+    with pytest.raises(ValueError, match="printed nothing: No sensors found!$"):
+        next(stream)
+    assert not channel.recv_stderr_ready()
+    assert channel.closed
+
+
+def test_main_poll_interval(monkeypatch, capsys):
+    """Polling checks every sample and exits with the worst code seen."""
+    bad = {"chip0": {"temp1_input": -30000, "temp2_input": 25000, "humidity1_input": 50000}}
+    monkeypatch.setattr(sensors_checking, "SensorStream", lambda *a, **k: iter([SAMPLE_JSON, bad, SAMPLE_JSON]))
+
+    exit_exc = run_main_and_capture(
+        monkeypatch,
+        ["host", "user", "--password", "pass", "--poll-interval", "1"]
+    )
+    assert exit_exc.code == 2
+    assert capsys.readouterr().out.count("All sensors within range") == 2
+
+
+def test_flatten_sensors_ignores_non_input_labels():
+    """Only temp*/humidity* input fields are collected, in JSON order."""
+    data = {
+        "chip1": {"Adapter": "ISA adapter", "temp1_max": 90000, "humidity1_input": 40000, "temp1_input": 21000},
+        "chip2": {"Adapter": "ISA adapter", "temp1_max": 90000, "humidity1_input": 41000, "temp1_input": 22000},
+    }
+    assert sensors_checking.flatten_sensors(data) == {"temp": [21.0, 22.0], "hum": [40.0, 41.0]}
+
+
+class FakeExecChannel:
+    """Session channel of a finished command with the given output and exit status."""
+    def __init__(self, out, err, status):
+        self.out = io.BytesIO(out)
+        self.err = io.BytesIO(err)
+        self.status = status
+        self.closed = False
+
+    def exec_command(self, cmd):
+        pass
+
+    def _pending(self, stream):
+        return stream.tell() < len(stream.getbuffer())
+
+    def recv_ready(self):
+        return self._pending(self.out)
+
+    def recv_stderr_ready(self):
+        return self._pending(self.err)
+
+    def recv(self, nbytes):
+        return self.out.read(min(nbytes, 2))
+
+    def recv_stderr(self, nbytes):
+        return self.err.read(min(nbytes, 2))
+
+    def exit_status_ready(self):
+        return True
+
+    def recv_exit_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = True
+
+
+def test_ssh_run_success_skips_stderr(monkeypatch, capsys):
+    """stderr is drained but not reported when the command succeeds."""
+    channel = FakeExecChannel(b"output", b"noise", 0)
+    fake_exec_client(monkeypatch, channel)
+    assert real_ssh_run("host", "user", password="pass", cmd="true") == b"output"
+    assert not channel.recv_stderr_ready()
+    assert channel.closed
+    assert capsys.readouterr().err == ""
+
+
+def test_ssh_run_failure_reports_stderr(monkeypatch, capsys):
+    """stderr is reported with the exit status when the command fails."""
+    channel = FakeExecChannel(b"", b"sensors: not found", 127)
+    fake_exec_client(monkeypatch, channel)
+    assert real_ssh_run("host", "user", password="pass", cmd="sensors -j") == b""
+    assert "exit status 127" in capsys.readouterr().err
+
+
+def test_ssh_run_drains_stderr_while_reading(monkeypatch):
+    """stdout behind a full stderr window is still read, stderr is not left for the end."""
+    class StderrFirstChannel(FakeExecChannel):
+        def recv(self, nbytes):
+            # The remote blocks on stderr until its window is read
+            assert not self.recv_stderr_ready(), "stdout read while stderr is pending"
+            return super().recv(nbytes)
+
+    channel = StderrFirstChannel(b"output", b"warning " * 100, 0)
+    fake_exec_client(monkeypatch, channel)
+    assert real_ssh_run("host", "user", password="pass", cmd="sensors -j") == b"output"
+
+
+def test_import_does_not_load_heavy_modules():
+    """paramiko and numpy are only imported when a connection or an array needs them."""
+    code = "import sys, sensors_checking; sys.exit('paramiko' in sys.modules or 'numpy' in sys.modules)"
+    root = os.path.dirname(os.path.abspath(sensors_checking.__file__))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
+
+
+def test_main_help(monkeypatch, capsys):
+    """--help renders and exits 0."""
+    exit_exc = run_main_and_capture(monkeypatch, ["--help"])
+    assert exit_exc.code == 0
+    assert "--hum-range" in capsys.readouterr().out
+
+
+def test_sensors_memo(monkeypatch, tmp_path):
+    """With SENSORS_MEMO=1 the output is fetched once and then read from disk."""
+    calls = []
+
+    def counting_ssh(host, user, password=None, key=None, cmd="", port=22):
+        calls.append(host)
+        return json.dumps(SAMPLE_JSON).encode()
+    monkeypatch.setattr(sensors_checking, "ssh_run", counting_ssh)
+    monkeypatch.setattr(sensors_checking.time, "time", lambda: 1_700_000_000.0)
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setenv("SENSORS_MEMO", "1")
+    assert sensors_checking.get_sensors_json("host", "user", password="pass") == SAMPLE_JSON
+    assert sensors_checking.get_sensors_json("host", "user", password="pass") == SAMPLE_JSON
+    assert len(calls) == 1
+    assert len(list((tmp_path / sensors_checking.MEMO_DIR).iterdir())) == 1
+
+    monkeypatch.delenv("SENSORS_MEMO")
+    sensors_checking.get_sensors_json("host", "user", password="pass")
+    assert len(calls) == 2
+
+
+def test_flatten_and_validate():
+    """The fused pass gives the same values and issues as the two separate steps."""
+    data = {
+        "chip1": {"humidity1_input": 150000, "temp1_input": -30000, "temp2_input": "n/a"},
+        "chip2": {"temp1_input": 25000, "temp2_input": 90000, "humidity1_input": 45000},
+    }
+    ranges = {"temp": sensors_checking.Range(-20, 80), "hum": sensors_checking.Range(0, 100)}
+    vals, issues = sensors_checking.flatten_and_validate(data, ranges)
+    assert vals == sensors_checking.flatten_sensors(data)
+    assert issues == sensors_checking.validate(vals, ranges)
+
+
+def test_flatten_and_validate_rounding():
+    """Values ending in 50 millidegrees round the same way in the fused and the two-step paths."""
+    data = {"chip1": {"temp1_input": 24050, "temp2_input": 150, "temp3_input": 350, "humidity1_input": 100250}}
+    ranges = {"temp": sensors_checking.Range(0.2, 24.05), "hum": sensors_checking.Range(0, 100)}
+    vals, issues = sensors_checking.flatten_and_validate(data, ranges)
+    assert vals == sensors_checking.flatten_sensors(data) == {"temp": [24.1, 0.1, 0.3], "hum": [100.2]}
+    assert issues == sensors_checking.validate(vals, ranges) == [
+        "temp1: 24.1 out of 0.2..24.05", "temp2: 0.1 out of 0.2..24.05", "hum1: 100.2 out of 0..100"
+    ]
+
+
+@pytest.mark.parametrize("interval", ["0", "-1"])
+def test_main_poll_interval_must_be_positive(monkeypatch, interval):
+    """Non-positive intervals are rejected by argparse."""
+    exit_exc = run_main_and_capture(
+        monkeypatch,
+        ["host", "user", "--password", "pass", "--poll-interval", interval]
+    )
+    assert exit_exc.code == 2
+
+
+def test_main_poll_no_samples(monkeypatch):
+    """A stream that ends before any sample is checked does not exit 0."""
+    monkeypatch.setattr(sensors_checking, "SensorStream", lambda *a, **k: iter([]))
+    exit_exc = run_main_and_capture(
+        monkeypatch,
+        ["host", "user", "--password", "pass", "--poll-interval", "1"]
+    )
+    assert exit_exc.code == 1
+
+
+@pytest.mark.parametrize("error, message", [
+    (ValueError("empty sample"), "Error reading sensors sample: empty sample"),
+    (sensors_checking.orjson.JSONDecodeError("bad", "{", 1), "Error parsing sensors JSON"),
+])
+def test_main_poll_invalid_sample(monkeypatch, capsys, error, message):
+    """An empty or invalid sample stops polling with exit code 3 and its own message."""
+    def samples(*args, **kwargs):
+        yield SAMPLE_JSON
+        raise error
+    monkeypatch.setattr(sensors_checking, "SensorStream", samples)
+    exit_exc = run_main_and_capture(
+        monkeypatch,
+        ["host", "user", "--password", "pass", "--poll-interval", "1"]
+    )
+    assert exit_exc.code == 3
+    assert message in capsys.readouterr().out
+
+
+def test_sensors_memo_skips_failed_output(monkeypatch, tmp_path):
+    """Empty or invalid output is not cached."""
+    outputs = [b"", b'{"chip1": {"temp1_in', json.dumps(SAMPLE_JSON).encode()]
+    monkeypatch.setattr(sensors_checking, "ssh_run", lambda *a, **k: outputs.pop(0))
+    monkeypatch.setattr(sensors_checking.time, "time", lambda: 1_700_000_000.0)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SENSORS_MEMO", "1")
+
+    assert sensors_checking.get_sensors_raw("host", "user", password="pass") == b""
+    assert sensors_checking.get_sensors_raw("host", "user", password="pass") == b'{"chip1": {"temp1_in'
+    assert sensors_checking.get_sensors_json("host", "user", password="pass") == SAMPLE_JSON
+    assert sensors_checking.get_sensors_json("host", "user", password="pass") == SAMPLE_JSON
+    assert [p.suffix for p in (tmp_path / sensors_checking.MEMO_DIR).iterdir()] == [".json"]